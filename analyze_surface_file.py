@@ -1,25 +1,132 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
-# Get list of subdirectories
-subdirs = [d for d in os.listdir() if os.path.isdir(d)]
+# Bump whenever the cached DataFrame changes shape or meaning, so old caches are rebuilt
+_CACHE_VERSION = 2
 
-# Read CSV files and handle duplicates by averaging over 'x'
-data = {}
-for subdir in subdirs:
+def _average_duplicates(df):
+    """
+    Sort by 'x' and average rows that share the same 'x' value.
+    Surface nodes are usually unique in 'x', so that case only sorts.
+    """
+    # Only numeric columns can be averaged or plotted
+    df = df.select_dtypes('number').dropna(subset=['x'])
+    if df['x'].is_unique:
+        return df.sort_values('x', kind='stable').reset_index(drop=True)
+
+    df = df.sort_values('x', kind='stable')
+    x = df['x'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, np.diff(x) != 0])
+
+    # NaN-aware means over runs of equal 'x', like groupby().mean()
+    values = df.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return pd.DataFrame(means, columns=df.columns)
+
+def _lttb(x, y, n_out=2000):
+    """
+    Downsample a curve to n_out points with Largest-Triangle-Three-Buckets,
+    which keeps peaks that plain decimation would miss. The first and last
+    points are always kept; shorter curves are returned unchanged.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    # Split the interior points into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    sizes = np.diff(edges)
+    x_avg = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    y_avg = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    # The last bucket looks ahead to the final point instead of a bucket average
+    x_avg = np.append(x_avg[1:], x[-1])
+    y_avg = np.append(y_avg[1:], y[-1])
+
+    idx = np.empty(n_out, dtype=np.intp)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area between the last kept point, each candidate
+        # in this bucket and the average of the next bucket
+        area = np.abs((x[a] - x_avg[i]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (y_avg[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+def _load_surface(subdir):
+    """
+    Read surface.csv from a subdirectory, averaging duplicate 'x' rows.
+    The result is cached as Parquet next to the CSV, with a JSON sidecar
+    recording the CSV's mtime and size; the cache is only reused on an exact
+    match. Returns None if nothing was loaded.
+    """
     csv_file = os.path.join(subdir, "surface.csv")
-    if os.path.exists(csv_file):
+    cache_file = os.path.join(subdir, ".surface.cache.parquet")
+    key_file = os.path.join(subdir, ".surface.cache.json")
+    if not os.path.isfile(csv_file):
+        return None
+
+    stat = os.stat(csv_file)
+    cache_key = {'version': _CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    try:
+        with open(key_file) as f:
+            cache_hit = json.load(f) == cache_key
+    except (OSError, ValueError):
+        cache_hit = False
+    if cache_hit:
         try:
-            df = pd.read_csv(csv_file)
-            if 'x' in df.columns:
-                # Group by 'x' and take mean to handle duplicates
-                df = df.groupby('x').mean().reset_index()
-                data[subdir] = df
-            else:
-                print(f"Warning: 'x' column missing in {csv_file}. Skipping file.")
+            return pd.read_parquet(cache_file, engine='pyarrow')
         except Exception as e:
-            print(f"Error reading {csv_file}: {e}")
+            print(f"Warning: could not read cache {cache_file}: {e}. Re-reading CSV.")
+
+    try:
+        try:
+            df = pd.read_csv(csv_file, engine='pyarrow')
+        except ImportError:
+            df = pd.read_csv(csv_file)
+        if 'x' not in df.columns:
+            print(f"Warning: 'x' column missing in {csv_file}. Skipping file.")
+            return None
+        # Take the mean over duplicate 'x' values
+        df = _average_duplicates(df)
+    except Exception as e:
+        print(f"Error reading {csv_file}: {e}")
+        return None
+
+    try:
+        # Drop the old key first so a failed write never leaves a matching key behind
+        if os.path.exists(key_file):
+            os.remove(key_file)
+        df.to_parquet(cache_file, engine='pyarrow', compression='zstd')
+        with open(key_file, 'w') as f:
+            json.dump(cache_key, f)
+    except ImportError:
+        pass  # pyarrow not installed, run without the cache
+    except Exception as e:
+        print(f"Warning: could not write cache {cache_file}: {e}")
+    return df
+
+# Get list of subdirectories
+with os.scandir('.') as entries:
+    subdirs = [entry.name for entry in entries if entry.is_dir()]
+
+# Read CSV files (or their cached copies) and handle duplicates by averaging over 'x',
+# in parallel; read_csv releases the GIL while parsing, so threads overlap I/O and parsing
+data = {}
+with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as executor:
+    for subdir, df in zip(subdirs, executor.map(_load_surface, subdirs)):
+        if df is not None:
+            data[subdir] = df
 
 # Check if data was loaded and get available variables
 if not data:
@@ -40,47 +147,50 @@ var_labels = {
     # Add more mappings as required
 }
 
-# Initialize Plotly figure
-fig = go.Figure()
+# Extract plain arrays and shortened legend labels once per subdirectory
+x_values = {subdir: df['x'].to_numpy() for subdir, df in data.items()}
+labels = {subdir: subdir.replace("wedge_", "") for subdir in data}
 
-# Add traces for each variable and subdirectory
+# Collect traces for each variable and subdirectory
+traces = []
 for var_idx, variable in enumerate(variables):
     for sub_idx, subdir in enumerate(subdirs):
         if variable in data[subdir].columns:
             # Make first variable’s traces visible initially
             visible = True if var_idx == 0 else False
-            fig.add_trace(
-                go.Scatter(
-                    x=data[subdir]['x'],
-                    y=data[subdir][variable],
-                    name=subdir.replace("wedge_", ""),  # Shorten legend labels
+            # Reduce long curves to about the number of points the plot can show
+            x, y = _lttb(x_values[subdir], data[subdir][variable].to_numpy())
+            traces.append(
+                go.Scattergl(
+                    x=x,
+                    y=y,
+                    name=labels[subdir],
                     mode='lines',
                     line=dict(width=2),  # Thicker lines for visibility
                     visible=visible
                 )
             )
 
+# Build the Plotly figure in one go rather than one add_trace call per trace
+fig = go.Figure(data=traces)
+
 # Create dropdown buttons to toggle variables
-buttons = []
-total_traces = len(subdirs) * len(variables)
-for var_idx, variable in enumerate(variables):
-    visible_list = [False] * total_traces
-    start_idx = var_idx * len(subdirs)
-    end_idx = start_idx + len(subdirs)
-    for i in range(start_idx, end_idx):
-        visible_list[i] = True
-    button = dict(
+# Row i of the visibility matrix shows only the traces of variable i
+vis_matrix = np.eye(len(variables), dtype=bool).repeat(len(subdirs), axis=1)
+buttons = [
+    dict(
         label=variable,
         method='update',
         args=[
-            {'visible': visible_list},
+            {'visible': vis_matrix[var_idx].tolist()},
             {
                 'title': f'{variable} Comparison Across Simulations',
                 'yaxis.title': var_labels.get(variable, variable)
             }
         ]
     )
-    buttons.append(button)
+    for var_idx, variable in enumerate(variables)
+]
 
 # Customize layout for a professional, polished appearance
 fig.update_layout(
@@ -157,6 +267,8 @@ fig.update_layout(
     ]
 )
 
-# Save the interactive plot as HTML without the Plotly logo
-fig.write_html("interactive_plot.html", config={'displaylogo': False}, include_plotlyjs='cdn')
+# Save the interactive plot as HTML without the Plotly logo. plotly.min.js is
+# written next to it once and shared by every plot saved in this directory,
+# so the page loads offline without fetching the library from the CDN.
+fig.write_html("interactive_plot.html", config={'displaylogo': False}, include_plotlyjs='directory')
 print("Interactive plot saved as 'interactive_plot.html'")
@@ -1,52 +1,94 @@
+import csv
+import mmap
 import os
+import re
 import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import math
 
+# Splits a '|'-delimited line and strips whitespace around each field in one pass
+_PIPE_SPLIT = re.compile(r'\s*\|\s*').split
+
+# Spellings of NaN that float() accepts; pandas turns them into NaN like invalid text
+_NAN_LITERALS = {'nan', '+nan', '-nan'}
+
 def read_and_parse_dat(file_path):
     """
     Read and parse a .dat file, returning a DataFrame with all columns.
     Assumes data section starts with a header containing 'Inner_Iter'.
     """
-    data = []
-    columns = None
-    in_data_section = False
-    line_number = 0
-
-    with open(file_path, 'r') as f:
-        for line in f:
-            line_number += 1
-            stripped_line = line.strip()
-
-            if 'Inner_Iter' in stripped_line and not in_data_section:
-                columns = [col.strip() for col in stripped_line.split('|') if col.strip()]
-                print(f"Line {line_number} - Header found: {columns}")
-                in_data_section = True
-                next(f, None)  # Skip separator line
-                continue
-
-            if in_data_section:
-                if not stripped_line or stripped_line.startswith('+'):
-                    continue
-
-                values = [val.strip() for val in stripped_line.split('|') if val.strip()]
-                if len(values) != len(columns):
-                    print(f"Line {line_number} - Skipped: Expected {len(columns)} values, got {len(values)}")
-                    continue
-
-                try:
-                    parsed_values = [int(values[0])] + [float(val) for val in values[1:]]
-                    data.append(parsed_values)
-                except ValueError as e:
-                    print(f"Line {line_number} - Skipped: Invalid data - {e}")
-                    continue
-
-    if columns is None:
+    if os.path.getsize(file_path) == 0:
         raise ValueError("Header with 'Inner_Iter' not found.")
-    if not data:
+
+    # Locate the header in the memory-mapped file without iterating over lines
+    # in Python, then let pandas read the data block straight from the file
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = mm.find(b'Inner_Iter')
+            if pos == -1:
+                raise ValueError("Header with 'Inner_Iter' not found.")
+            header_start = mm.rfind(b'\n', 0, pos) + 1
+            header_end = mm.find(b'\n', pos)
+            if header_end == -1:
+                header_end = len(mm)
+            # Copies only the preamble above the header, counted in one C-level call
+            header_line = mm[:header_start].count(b'\n') + 1
+            header = mm[header_start:header_end].decode(errors='replace')
+            columns = [col for col in _PIPE_SPLIT(header.strip()) if col]
+            print(f"Line {header_line} - Header found: {columns}")
+
+            # Skip the separator line below the header
+            separator_end = mm.find(b'\n', header_end + 1)
+            data_start = separator_end + 1 if separator_end != -1 else len(mm)
+
+        # A leading/trailing '|' in the table produces an empty edge field, and one
+        # extra column catches a surplus field; all of these must be empty in a valid
+        # row. Columns are read by position so repeated header names are allowed,
+        # and fields are kept as text so row validity can be judged before any
+        # numeric conversion.
+        n_leading = 1 if header.strip().startswith('|') else 0
+        n_trailing = 1 if header.strip().endswith('|') else 0
+        n_fields = n_leading + len(columns) + n_trailing + 1
+        f.seek(data_start)
+        df = pd.read_csv(
+            f,
+            sep='|',
+            header=None,
+            names=range(n_fields),
+            index_col=False,
+            engine='c',
+            skipinitialspace=True,
+            skip_blank_lines=True,
+            on_bad_lines='skip',
+            quoting=csv.QUOTE_NONE,
+            dtype=str,
+            keep_default_na=False,
+        )
+    df = df.apply(lambda col: col.str.strip())
+    raw = df.iloc[:, n_leading:n_leading + len(columns)]
+    edges = df.drop(columns=raw.columns)
+
+    # A row is valid if it has no surplus fields, no field is missing or empty, the
+    # first (Inner_Iter) field is an integer and every other field is a number;
+    # literal nan/inf residuals are kept
+    values = raw.apply(pd.to_numeric, errors='coerce').astype('float64')
+    is_nan_literal = raw.apply(lambda col: col.str.lower().isin(_NAN_LITERALS))
+    valid = (
+        (edges == '').all(axis=1)
+        & (raw != '').all(axis=1)
+        & raw.iloc[:, 0].str.fullmatch(r'[+-]?\d+')
+        & (values.notna() | is_nan_literal).all(axis=1)
+    )
+    df = values[valid].reset_index(drop=True)
+    df.columns = columns
+    if len(raw) > len(df):
+        print(f"Skipped {len(raw) - len(df)} invalid line(s) in the data section")
+
+    if df.empty:
         raise ValueError("No valid data found after the header.")
-    return pd.DataFrame(data, columns=columns)
+    df['Inner_Iter'] = df['Inner_Iter'].astype('int64')
+    return df
 
 def plot_data(df, log_scale=False):
     """
@@ -70,8 +112,9 @@ def plot_data(df, log_scale=False):
         n_rows = 2
         max_cols = math.ceil(n_plots / 2)  # Enough columns to fit all plots in 2 rows
 
-    # Create subplots with shared x-axis
-    fig, axes = plt.subplots(n_rows, max_cols, figsize=(5 * max_cols, 4 * n_rows), sharex=True)
+    # Create subplots with shared x-axis; constrained layout avoids a separate tight_layout pass
+    fig, axes = plt.subplots(n_rows, max_cols, figsize=(5 * max_cols, 4 * n_rows), sharex=True,
+                             layout='constrained')
     
     # Handle case where axes is not a 2D array (e.g., 1 row)
     if n_rows == 1:
@@ -97,15 +140,15 @@ def plot_data(df, log_scale=False):
         bottom_axes = axes
     else:
         bottom_axes = axes[(n_rows - 1) * max_cols : n_rows * max_cols]
+    live_ids = {id(a) for a in fig.axes}
     for ax in bottom_axes:
-        if ax in fig.axes:  # Ensure axis hasn’t been deleted
+        if id(ax) in live_ids:  # Ensure axis hasn’t been deleted
             ax.set_xlabel('Inner_Iter')
 
     # Remove unused subplots
     for j in range(i + 1, n_rows * max_cols):
         fig.delaxes(axes[j])
 
-    plt.tight_layout()
     plt.show()
 
 # Parse command-line arguments